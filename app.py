@@ -1,7 +1,17 @@
 # app.py
 import os
 import ee
-from flask import Flask, render_template, request, jsonify
+import numpy as np
+import requests
+import json
+import hashlib
+import threading
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+from cachelib import SimpleCache
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context
+from flask_compress import Compress
 from datetime import datetime, timedelta
 
 # Setup map HTML path (Not used for dynamic maps, but kept for consistency)
@@ -9,13 +19,18 @@ MAPS_TEMPLATE_DIR = os.path.join(os.getcwd(), 'templates', 'maps')
 MAP_HTML_PATH = os.path.join(MAPS_TEMPLATE_DIR, 'map.html')
 os.makedirs(MAPS_TEMPLATE_DIR, exist_ok=True)
 
+# Earth Engine high-volume endpoint: higher concurrency ceiling for getMapId and tile requests
+EE_HIGH_VOLUME_URL = 'https://earthengine-highvolume.googleapis.com'
+
 # Initialize Earth Engine
 try:
-    ee.Initialize(project='ee-sachinbobbili')
+    ee.Initialize(project='ee-sachinbobbili', opt_url=EE_HIGH_VOLUME_URL)
     print("Earth Engine initialized successfully.")
 
     # Load Earth Engine assets
-    INDIA_DIST_FC = ee.FeatureCollection("users/sachinbobbili/India_Dist")
+    # District boundaries with a combined 'stdt' ("state|district") key property,
+    # exported from India_Dist by scripts/export_keyed_districts.py
+    INDIA_DIST_FC = ee.FeatureCollection("users/sachinbobbili/India_Dist_keyed")
 
     # New Layers as per request:
     # Google Dynamic World V1 (ImageCollection)
@@ -24,25 +39,59 @@ try:
     # Global Surface Water Layer (Image)
     DYNAMIC_WORLD = ee.ImageCollection("GOOGLE/DYNAMICWORLD/V1")
     SRTM_DEM_90M = ee.Image("CGIAR/SRTM90_V4")
+    # Slope (degrees) precomputed from SRTM DEM by scripts/export_slope_asset.py
+    SRTM_SLOPE = ee.Image("users/sachinbobbili/India_slope")
     HYDROSHEDS_RIVERS_FC = ee.FeatureCollection("WWF/HydroSHEDS/v1/FreeFlowingRivers")
     JRC_GSW = ee.Image("JRC/GSW1_4/GlobalSurfaceWater")
 
-    # Pre-fetch the list of states for the dropdown menu
-    STATES_LIST = INDIA_DIST_FC.aggregate_array('stname').distinct().sort().getInfo()
+    # District boundaries are static, so pre-fetch the centroid and bounding box of
+    # every district in a single request instead of computing them per request.
+    district_props = INDIA_DIST_FC.map(lambda f: ee.Feature(None, {
+        'stname': f.get('stname'),
+        'dtname': f.get('dtname'),
+        'centroid': f.geometry().centroid(maxError=100).coordinates(),
+        'bounds': f.geometry().bounds(maxError=100).coordinates()
+    })).reduceColumns(
+        ee.Reducer.toList(4), ['stname', 'dtname', 'centroid', 'bounds']
+    ).get('list').getInfo()
+
+    DISTRICT_CACHE = {}
+    for stname, dtname, centroid, bounds in district_props:
+        lons = [point[0] for point in bounds[0]]
+        lats = [point[1] for point in bounds[0]]
+        # Keep the first feature per district, matching district_fc.first()
+        DISTRICT_CACHE.setdefault((stname, dtname), {
+            'center': [centroid[1], centroid[0]], # [lat, lon] for Leaflet
+            'bounds': [[min(lats), min(lons)], [max(lats), max(lons)]] # [[south, west], [north, east]]
+        })
+
+    # A single nationwide boundary layer; the frontend restricts it to the selected district's bounds
+    BOUNDARY_URL = INDIA_DIST_FC.style(
+        color='red',            # Color of the boundary line
+        width=1,                # The width of the line in pixels
+        fillColor='00000000'    # Transparent fill
+    ).getMapId()['tile_fetcher'].url_format
+
+    # List of states for the dropdown menu
+    STATES_LIST = sorted({stname for stname, _ in DISTRICT_CACHE})
 except Exception as e:
     print(f"EE init or asset load failed: {e}")
     # Set assets to None and states list to empty if initialization fails
     INDIA_DIST_FC = None
     DYNAMIC_WORLD = None
     SRTM_DEM_90M = None
+    SRTM_SLOPE = None
     HYDROSHEDS_RIVERS_FC = None
     JRC_GSW = None
+    DISTRICT_CACHE = {}
+    BOUNDARY_URL = None
     STATES_LIST = []
 
-# Define visualization parameters for ALL layers globally, including names for the chart/legends
+# Define visualization parameters for ALL layers globally, including names for the chart/legends.
+# They are wrapped in read-only MappingProxyType views since they are shared by every request and thread.
 # Google Dynamic World V1 LULC Visualization Parameters & Names
 # Values for 'label' band are 0-8
-LANDCOVER_VIS = {
+LANDCOVER_VIS = MappingProxyType({
     'min': 0,
     'max': 8,
     'palette': [
@@ -57,15 +106,15 @@ LANDCOVER_VIS = {
         '#B39FE1'   # 8: Snow and ice
     ],
     'names': [
-        'Water', 'Trees', 'Grass', 'Flooded vegetation ', 'Crops',
+        'Water', 'Trees', 'Grass', 'Flooded vegetation', 'Crops',
         'Shrub and scrub', 'Built', 'Bare', 'Snow and ice'
     ],
     'title': 'Dynamic World LULC'
-}
+})
 
 # SRTM DEM 90m Visualization Parameters
 
-DEM_VIS = {
+DEM_VIS = MappingProxyType({
     "min": 0,
     "max": 3000,
     "palette": [
@@ -77,11 +126,11 @@ DEM_VIS = {
         "#800000"   # high elevation,
     ],
     'title': 'SRTM DEM Elevation (m)'
-}
+})
 
 
 # Slope Visualization Parameters (derived from SRTM DEM)
-SLOPE_VIS =  {
+SLOPE_VIS = MappingProxyType({
     "min": 0,
     "max": 45,
     "palette": [
@@ -92,30 +141,361 @@ SLOPE_VIS =  {
         "#08306b"
     ],
     'title': 'Slope (Degrees)'
-}
+})
 
 # River Networks (HydroSHEDS Free Flowing Rivers - FeatureCollection)
-RIVERS_VIS = {
+RIVERS_VIS = MappingProxyType({
     'palette': ['#0000FF'], # A single color for river lines (Blue)
     'title': 'HydroSHEDS River Networks'
-}
+})
 
 # Global Surface Water (JRC GSW)
 # We will visualize 'occurrence' band.
-JRC_GSW_VIS = {
+JRC_GSW_VIS = MappingProxyType({
     'bands': ['occurrence'], # Select the 'occurrence' band
     'min': 0,
     'max': 100, # Percentage
     'palette': ['#FFFFFF', '#0000FF'], # White (0%) to Blue (100%)
     'names': ['0-20%', '20-40%', '40-60%', '60-80%', '80-100%'], # Custom labels for legend
     'title': 'Global Surface Water Occurrence (%)'
-}
+})
+
+
+# Cache for computed map payloads, keyed by state, district and month.
+# Tile URLs, centroid and chart data only change when the Dynamic World window rolls over.
+MAP_PAYLOAD_CACHE = SimpleCache(threshold=1000, default_timeout=86400) # 24 hours
+
+# Maximum number of (newest) Dynamic World scenes per Sentinel-2 tile composited into the
+# land cover mosaic. Capping per tile keeps every part of the district covered, while
+# fewer source images per pixel means less I/O for tiles and the area reduction.
+DW_MAX_IMAGES_PER_TILE = 4
+
+# Per-district tile layers served through the /tiles route. The boundary layer is
+# nationwide (BOUNDARY_URL) and is served without a district key.
+TILE_LAYERS = ['landcover', 'dem', 'slope', 'rivers', 'gsw']
+
+# Tile URL template per layer, district and month, so the /tiles route resolves a single
+# layer's getMapId instead of the whole district payload
+TILE_URL_CACHE = SimpleCache(threshold=5000, default_timeout=86400) # 24 hours
+
+# One lock per tile URL cache key, so a burst of tile requests for the same layer and
+# district computes its getMapId once per worker instead of once per request
+TILE_URL_LOCKS = {}
+TILE_URL_LOCKS_GUARD = threading.Lock()
 
+# Public base URL of a CDN (e.g. CloudFront) whose origin is this app's /tiles route.
+# When set, the frontend fetches tiles from the CDN instead of directly from Earth Engine.
+TILE_BASE_URL = os.environ.get('TILE_BASE_URL', '').rstrip('/')
+TILE_MAX_AGE = 86400 # 24 hours, matching MAP_PAYLOAD_CACHE
+
+# Shared HTTP session for fetching upstream Earth Engine tiles
+TILE_SESSION = requests.Session()
 
 # Initialize Flask
 app = Flask(__name__)
 app.config['STATES'] = STATES_LIST
 
+# after_request hooks run in reverse order of registration, so registering this one
+# before Compress(app) makes it run after Flask-Compress has settled the encoding
+@app.after_request
+def _evaluate_map_data_conditional(response):
+    """
+    Evaluate If-None-Match for /generate_map_data against the final ETag. Flask-Compress
+    rewrites the ETag of a compressed response to '<etag>:<algorithm>', so a validator
+    only matches the encoding it was issued for, and a 304 carries that same ETag.
+    """
+    if request.endpoint != 'generate_map_data' or response.status_code != 200:
+        return response
+    if request.method in ('GET', 'HEAD'):
+        return response.make_conditional(request)
+    # RFC 9110: a matching If-None-Match fails the other methods with 412
+    if request.if_none_match.contains_weak(response.get_etag()[0]):
+        return Response(status=412)
+    return response
+
+# Compress JSON responses (long, repetitive tile URLs and dropdown lists), preferring Brotli
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
+# Precomputed dropdown data (generated by scripts/precompute_dropdowns.py)
+DROPDOWN_DATA_DIR = os.path.join(app.static_folder, 'data')
+DROPDOWN_MAX_AGE = 604800 # 1 week; district lists are static
+
+# ==============================================================================
+# Map Payload Helpers
+# ==============================================================================
+
+def _build_district_layers(state, district, end_date):
+    """
+    Build the clipped tile layer images for a district. No Earth Engine round-trip is made.
+    Returns the district geometry and a dict of layer name -> (image, visualization parameters).
+    """
+    # Get the feature as a FeatureCollection (even if it contains only one feature),
+    # using a single equality filter on the combined key instead of two predicates
+    district_fc = INDIA_DIST_FC.filter(ee.Filter.eq('stdt', f"{state}|{district}"))
+    
+    # Get the single feature and its geometry from the collection
+    district_feature = district_fc.first()
+    geom = district_feature.geometry()
+    
+    # --- Dynamic World LULC (last two months) ---
+    start_date = end_date - timedelta(days=60) # Last 60 days
+    
+    # Filter Dynamic World by date and tag each scene with its Sentinel-2 (MGRS) tile,
+    # the last 6 characters of system:index (e.g. 'T43QGB')
+    dw_scenes = DYNAMIC_WORLD.filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')) \
+                             .filterBounds(geom) \
+                             .map(lambda img: img.set('mgrs_tile', ee.String(img.get('system:index')).slice(-6)))
+
+    # Keep only the newest scenes of each tile covering the district, so the cap never
+    # drops a whole tile, then take the latest mosaic.
+    # Scenes are re-sorted oldest first so the newest ends up on top of the mosaic.
+    newest_scenes = dw_scenes.aggregate_array('mgrs_tile').distinct().map(
+        lambda tile: dw_scenes.filter(ee.Filter.eq('mgrs_tile', tile))
+                              .limit(DW_MAX_IMAGES_PER_TILE, 'system:time_start', False)
+                              .toList(DW_MAX_IMAGES_PER_TILE)
+    ).flatten()
+    dynamic_world_filtered = ee.ImageCollection.fromImages(newest_scenes) \
+                               .sort('system:time_start') \
+                               .mosaic() \
+                               .select('label') # Select the 'label' band for LULC
+    landcover_clipped = dynamic_world_filtered.clip(geom)
+
+    # --- SRTM DEM 90m and Slope ---
+    # Elevation and the materialized slope as bands of one clipped image, so both layers
+    # share a single clip instead of building two independent clipped images
+    dem_slope_clipped = SRTM_DEM_90M.rename('elev') \
+                                    .addBands(SRTM_SLOPE.rename('slope')) \
+                                    .clip(geom)
+    dem_clipped = dem_slope_clipped.select('elev')
+    slope_clipped = dem_slope_clipped.select('slope')
+
+    # --- River Networks (FeatureCollection) ---
+    # style() renders the lines in a single server-side op, unlike paint() + visualize()
+    rivers_styled = HYDROSHEDS_RIVERS_FC.filterBounds(geom).style(
+        color=RIVERS_VIS['palette'][0].lstrip('#'),   # Single color for river lines
+        width=2                                       # Width of the line in pixels
+    )
+
+    # --- Global Surface Water (JRC GSW) ---
+    gsw_clipped = JRC_GSW.clip(geom)
+
+    # Image and visualization parameters for each tile layer.
+    # Rivers are already visualized, so they need no parameters.
+    layers = {
+        'landcover': (landcover_clipped, LANDCOVER_VIS),
+        'dem': (dem_clipped, DEM_VIS),
+        'slope': (slope_clipped, SLOPE_VIS),
+        'rivers': (rivers_styled, None),
+        'gsw': (gsw_clipped, JRC_GSW_VIS),
+    }
+    return geom, layers
+
+def _iter_map_payload(state, district, end_date):
+    """
+    Build the tile URLs, map properties, and chart data for a district, yielding each
+    part of the payload as a dict as soon as it is available. The final part carries 'status'.
+    The (state, district) pair must be a key of DISTRICT_CACHE.
+    """
+
+    # Centroid, bounds and boundary layer were precomputed at startup, so they go out first
+    district_info = DISTRICT_CACHE[(state, district)]
+    yield {
+        'boundary_url': BOUNDARY_URL,
+        'bounds': district_info['bounds'],
+        'center': district_info['center'],
+        'zoom': 9
+    }
+
+    geom, layers = _build_district_layers(state, district, end_date)
+    landcover_clipped = layers['landcover'][0]
+
+    # ======================================================================
+    # District Statistics (single getInfo round-trip)
+    # ======================================================================
+
+    # Bundle the district statistics into one ee.Dictionary so they come back in a single request.
+    # The district is known to exist (validated against DISTRICT_CACHE), so no existence check is needed.
+    district_stats = ee.Dictionary({
+        # Sum the pixel area (sq m) of each land cover class, grouped by the 'label' band.
+        # Dynamic World 'label' band values are 0-8 directly. Sampling the 10m labels at 30m
+        # (coarser still if bestEffort has to back off) reads ~9x fewer pixels, so the
+        # per-class areas are approximate; fine for the chart's percentage shares.
+        'areas': ee.Image.pixelArea().addBands(landcover_clipped).reduceRegion(
+            reducer=ee.Reducer.sum().group(groupField=1, groupName='class'),
+            geometry=geom,
+            scale=30,
+            bestEffort=True,
+            maxPixels=1e10
+        ).get('groups') # List of {'class': value, 'sum': area} dictionaries
+    })
+
+    # ======================================================================
+    # Map Data Generation (Tile URLs)
+    # ======================================================================
+
+    # Every getMapId and the statistics getInfo are independent round-trips to
+    # Earth Engine, so dispatch them concurrently and yield each result as it completes.
+    with ThreadPoolExecutor(max_workers=len(layers) + 1) as executor:
+        futures = {executor.submit(district_stats.getInfo): 'stats'}
+        for name, (image, vis_params) in layers.items():
+            futures[executor.submit(image.getMapId, vis_params)] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            if name == 'stats':
+                yield {'chart_data': _build_chart_data(future.result())}
+            else:
+                yield {f'{name}_url': future.result()['tile_fetcher'].url_format}
+
+    yield {'status': 'success'}
+
+def _build_chart_data(district_stats):
+    """Build the land cover chart labels and values (sq km) from the district statistics."""
+    # Area (sq m) per Dynamic World class, keyed by integer 'label' value
+    areas_by_class = {int(group['class']): group['sum'] for group in district_stats.get('areas') or []}
+
+    # Fixed 0-8 class order without sorting. Classes absent from the district
+    # stay at 0 so bars line up with the palette.
+    class_areas = np.array([areas_by_class.get(cls, 0) for cls in range(len(LANDCOVER_VIS['names']))])
+
+    return {
+        'labels': list(LANDCOVER_VIS['names']),
+        'values': np.round(class_areas / 1e6, 2).tolist() # sq m to sq km
+    }
+
+def _map_payload_key(state, district, end_date):
+    """Key identifying a district's map payload; it rolls over monthly with the Dynamic World window."""
+    period_key = end_date.strftime('%Y-%m')
+    return f"{state}|{district}|{period_key}"
+
+def _iter_cached_map_payload(state, district):
+    """
+    Yield the map payload for a district in parts. A cached payload is yielded whole;
+    otherwise the parts are yielded as they are computed and the result is cached.
+    """
+    end_date = datetime.now()
+    cache_key = _map_payload_key(state, district, end_date)
+
+    payload = MAP_PAYLOAD_CACHE.get(cache_key)
+    if payload is not None:
+        yield payload
+        return
+
+    payload = {}
+    parts = _iter_map_payload(state, district, end_date)
+    try:
+        for part in parts:
+            payload.update(part)
+            yield part
+    except GeneratorExit:
+        # The client left mid-stream (e.g. picked another district). The Earth Engine calls
+        # in flight cannot be cancelled, so finish them in the background and cache the
+        # payload instead of blocking here on the executor and discarding the results.
+        threading.Thread(target=_finish_map_payload, args=(parts, payload, cache_key), daemon=True).start()
+        raise
+    MAP_PAYLOAD_CACHE.set(cache_key, payload)
+
+def _finish_map_payload(parts, payload, cache_key):
+    """Drain the remaining parts of an abandoned map payload stream and cache the payload."""
+    try:
+        for part in parts:
+            payload.update(part)
+    except Exception as e:
+        print(f"Error finishing map payload {cache_key}: {e}")
+        return
+    MAP_PAYLOAD_CACHE.set(cache_key, payload)
+
+def _get_map_payload(state, district):
+    """
+    Return the complete map payload for a district from MAP_PAYLOAD_CACHE, computing it on a miss.
+    """
+    payload = {}
+    for part in _iter_cached_map_payload(state, district):
+        payload.update(part)
+    return payload
+
+def _get_tile_url(layer, state, district):
+    """
+    Return the Earth Engine tile URL template for one layer of a district. Reuses a cached
+    payload when there is one; otherwise only that layer's getMapId is computed (never the
+    statistics), once per layer, district and month behind a lock.
+    """
+    end_date = datetime.now()
+    payload_key = _map_payload_key(state, district, end_date)
+
+    payload = MAP_PAYLOAD_CACHE.get(payload_key)
+    if payload is not None:
+        return payload[f'{layer}_url']
+
+    cache_key = f"{layer}|{payload_key}"
+    tile_url = TILE_URL_CACHE.get(cache_key)
+    if tile_url is not None:
+        return tile_url
+
+    with TILE_URL_LOCKS_GUARD:
+        lock = TILE_URL_LOCKS.setdefault(cache_key, threading.Lock())
+    with lock:
+        # Another request may have computed it while this one was waiting
+        tile_url = TILE_URL_CACHE.get(cache_key)
+        if tile_url is None:
+            _, layers = _build_district_layers(state, district, end_date)
+            image, vis_params = layers[layer]
+            tile_url = image.getMapId(vis_params)['tile_fetcher'].url_format
+            TILE_URL_CACHE.set(cache_key, tile_url)
+    # Later requests hit the cache, so the lock is no longer needed
+    with TILE_URL_LOCKS_GUARD:
+        TILE_URL_LOCKS.pop(cache_key, None)
+    return tile_url
+
+def _fetch_tile(tile_url, z, x, y):
+    """Fetch a tile from Earth Engine and return it as a cacheable response."""
+    upstream = TILE_SESSION.get(tile_url.format(z=z, x=x, y=y), timeout=30)
+    response = Response(upstream.content, status=upstream.status_code,
+                        content_type=upstream.headers.get('Content-Type', 'image/png'))
+    if upstream.ok:
+        response.headers['Cache-Control'] = f'public, max-age={TILE_MAX_AGE}'
+    return response
+
+def _with_tile_base_url(payload, state, district):
+    """
+    Point the tile URLs of a payload (or payload part) at TILE_BASE_URL, keyed by layer
+    and district, so repeat tile fetches are served from the CDN edge cache.
+    """
+    if not TILE_BASE_URL:
+        return payload
+    payload = dict(payload)
+    district_path = f"{quote(state, safe='')}/{quote(district, safe='')}"
+    for layer in TILE_LAYERS:
+        if f'{layer}_url' in payload:
+            payload[f'{layer}_url'] = f"{TILE_BASE_URL}/{layer}/{district_path}/{{z}}/{{x}}/{{y}}.png"
+    # The boundary layer is nationwide, so its tiles are shared by every district
+    if 'boundary_url' in payload:
+        payload['boundary_url'] = f"{TILE_BASE_URL}/boundary/{{z}}/{{x}}/{{y}}.png"
+    return payload
+
+def _validate_map_request(state, district):
+    """
+    Check a map data request. Returns an (error message, status code) tuple, or None if valid.
+    """
+    if not state or not district:
+        return 'Missing state or district', 400
+
+    # Check if all necessary Earth Engine assets are loaded
+    if not all([INDIA_DIST_FC, DYNAMIC_WORLD, SRTM_DEM_90M, SRTM_SLOPE, HYDROSHEDS_RIVERS_FC, JRC_GSW, BOUNDARY_URL]):
+        return 'Earth Engine assets not loaded. Check server logs for EE initialization errors.', 500
+
+    # Validate against the districts loaded at startup instead of querying Earth Engine
+    if (state, district) not in DISTRICT_CACHE:
+        return 'District not found in the dataset.', 404
+
+    return None
+
+def _sse_message(data):
+    """Format a dict as a Server-Sent Events message."""
+    return f"data: {json.dumps(data)}\n\n"
+
 # ==============================================================================
 # Flask Routes
 # ==============================================================================
@@ -131,6 +511,9 @@ def index():
 @app.route('/get_states')
 def get_states():
     """API endpoint to get the list of states."""
+    # Serve the precomputed static file when it has been generated
+    if os.path.isfile(os.path.join(DROPDOWN_DATA_DIR, 'states.json')):
+        return send_from_directory(DROPDOWN_DATA_DIR, 'states.json', max_age=DROPDOWN_MAX_AGE)
     if not STATES_LIST:
         return jsonify({'error': 'States data not available. Check EE connection or asset path.'}), 500
     return jsonify({'states': STATES_LIST})
@@ -138,169 +521,106 @@ def get_states():
 @app.route('/get_districts/<state_name>')
 def get_districts(state_name):
     """API endpoint to get the list of districts for a selected state."""
-    if not INDIA_DIST_FC:
+    # Serve the precomputed static file when it has been generated
+    districts_dir = os.path.join(DROPDOWN_DATA_DIR, 'districts')
+    if os.path.isfile(os.path.join(districts_dir, f'{state_name}.json')):
+        return send_from_directory(districts_dir, f'{state_name}.json', max_age=DROPDOWN_MAX_AGE)
+    # Otherwise answer from the district list loaded at startup, without an EE round-trip
+    if not DISTRICT_CACHE:
         return jsonify({'error': 'EE asset for districts is not loaded.'}), 500
-    try:
-        districts = INDIA_DIST_FC.filter(ee.Filter.eq('stname', state_name)) \
-                                 .aggregate_array('dtname').distinct().sort().getInfo()
-        return jsonify({'districts': districts})
-    except Exception as e:
-        print(f"Error fetching districts: {e}")
-        return jsonify({'error': str(e)}), 500
+    districts = sorted(dtname for stname, dtname in DISTRICT_CACHE if stname == state_name)
+    return jsonify({'districts': districts})
 
-@app.route('/generate_map_data', methods=['POST'])
+@app.route('/generate_map_data', methods=['GET', 'POST'])
 def generate_map_data():
     """
-    API endpoint to generate Earth Engine tile URLs, map properties, and chart data
-    for the frontend.
+    API endpoint to generate Earth Engine tile URLs, map properties, and chart data.
+    The frontend uses /generate_map_data/stream; this endpoint serves third-party clients.
+    GET (query string) responses can be cached and revalidated via ETag; POST (JSON body)
+    is kept for existing clients.
     """
-    data = request.get_json()
+    data = request.args if request.method == 'GET' else request.get_json()
     state = data.get('state')
     district = data.get('district')
 
-    if not state or not district:
-        return jsonify({'error': 'Missing state or district'}), 400
-    
-    # Check if all necessary Earth Engine assets are loaded
-    if not all([INDIA_DIST_FC, DYNAMIC_WORLD, SRTM_DEM_90M, HYDROSHEDS_RIVERS_FC, JRC_GSW]):
-        return jsonify({'error': 'Earth Engine assets not loaded. Check server logs for EE initialization errors.'}), 500
+    error = _validate_map_request(state, district)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
 
     try:
-        # Get the feature as a FeatureCollection (even if it contains only one feature)
-        district_fc = INDIA_DIST_FC.filter(ee.Filter.And(
-            ee.Filter.eq('stname', state),
-            ee.Filter.eq('dtname', district)
-        ))
-        
-        # Check if the FeatureCollection is empty
-        if district_fc.size().getInfo() == 0:
-            return jsonify({'error': 'District not found in the dataset.'}), 404
-        
-        # Get the single feature and its geometry from the collection
-        district_feature = district_fc.first()
-        geom = district_feature.geometry()
-        
-        # --- Dynamic World LULC (last two months) ---
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=60) # Last 60 days
-        
-        # Filter Dynamic World by date and take the latest mosaic
-        dynamic_world_filtered = DYNAMIC_WORLD.filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')) \
-                                              .filterBounds(geom) \
-                                              .mosaic() \
-                                              .select('label') # Select the 'label' band for LULC
-        landcover_clipped = dynamic_world_filtered.clip(geom)
-
-        # --- SRTM DEM 90m and Slope ---
-        dem_clipped = SRTM_DEM_90M.clip(geom)
-        slope_clipped = ee.Terrain.slope(dem_clipped).clip(geom) # Calculate slope from DEM
-
-        # --- River Networks (FeatureCollection) ---
-        rivers_filtered = HYDROSHEDS_RIVERS_FC.filterBounds(geom)
-        rivers_painted = ee.Image().paint(
-            featureCollection=rivers_filtered,
-            color=0,        # A single value to paint the features
-            width=2         # Width of the line in pixels
-        ).visualize(
-            palette=RIVERS_VIS['palette'],
-            opacity=1
-        )
-
-        # --- Global Surface Water (JRC GSW) ---
-        gsw_clipped = JRC_GSW.clip(geom)
-
-        # ======================================================================
-        # Map Data Generation (Tile URLs)
-        # ======================================================================
-        
-        landcover_map_id = landcover_clipped.getMapId(LANDCOVER_VIS)
-        landcover_url = landcover_map_id['tile_fetcher'].url_format
-
-        dem_map_id = dem_clipped.getMapId(DEM_VIS)
-        dem_url = dem_map_id['tile_fetcher'].url_format
-
-        slope_map_id = slope_clipped.getMapId(SLOPE_VIS)
-        slope_url = slope_map_id['tile_fetcher'].url_format
-
-        rivers_map_id = rivers_painted.getMapId() 
-        rivers_url = rivers_map_id['tile_fetcher'].url_format
-        
-        gsw_map_id = gsw_clipped.getMapId(JRC_GSW_VIS)
-        gsw_url = gsw_map_id['tile_fetcher'].url_format
-
-        # Get tile information for the district boundary layer
-        boundary_image = ee.Image().paint(
-            featureCollection=district_fc,
-            color=0,        # The value to paint (e.g., 0 for a solid color)
-            width=1         # The width of the line in pixels
-        ).visualize(
-            palette=['red'], # Color of the boundary line
-            opacity=1
-        )
-        boundary_map_id = boundary_image.getMapId()
-        boundary_url = boundary_map_id['tile_fetcher'].url_format
-
-        # Get the centroid of the geometry to center the map
-        centroid = geom.centroid().coordinates().getInfo()
-
-        # ======================================================================
-        # Chart Data Generation (Land Cover only)
-        # ======================================================================
-
-        # Calculate area for each land cover class using a frequency histogram
-        # Dynamic World 'label' band values are 0-8 directly.
-        histogram = landcover_clipped.reduceRegion(
-            reducer=ee.Reducer.frequencyHistogram(),
-            geometry=geom,
-            scale=10, # Dynamic World is 10m resolution
-            maxPixels=1e13
-        ).get('label').getInfo() # Get the result for the 'label' band
-
-        chart_labels = []
-        chart_values = []
-
-        # Create a mapping from Dynamic World label value to name
-        dw_label_to_name = {
-            0: 'Water', 1: 'Trees', 2: 'Grass', 3: 'Flooded vegetation',
-            4: 'Crops', 5: 'Shrub and scrub', 6: 'Built', 7: 'Bare', 8: 'Snow and ice'
-        }
-        
-        # Sort keys numerically to ensure consistent chart order
-        sorted_keys = sorted(histogram.keys(), key=lambda k: int(float(k)))
-
-        for key in sorted_keys:
-            class_value = int(float(key))
-            pixel_count = histogram[key]
-            area_sqkm = round((pixel_count * 100) / 1e6, 2) # 10m pixel = 100 sq m
-
-            label_name = dw_label_to_name.get(class_value, f'Class {class_value}')
-
-            chart_labels.append(label_name)
-            chart_values.append(area_sqkm)
-
-        # Return all data to the frontend
-        return jsonify({
-            'landcover_url': landcover_url,
-            'dem_url': dem_url, 
-            'slope_url': slope_url,         # New
-            'rivers_url': rivers_url,       
-            'gsw_url': gsw_url,             
-            'boundary_url': boundary_url,
-            'center': [centroid[1], centroid[0]], 
-            'zoom': 9, 
-            'chart_data': {
-                'labels': chart_labels,
-                'values': chart_values
-            },
-            'status': 'success'
-        })
-
+        payload = _get_map_payload(state, district)
+        response = jsonify(_with_tile_base_url(payload, state, district))
     except Exception as e:
         print(f"Error in generate_map_data for {state}, {district}: {e}")
         return jsonify({'error': f'Map data generation failed: {e}. Check server logs.'}), 500
 
+    # Hash the served body, so a refreshed payload or a new TILE_BASE_URL changes the ETag.
+    # If-None-Match is evaluated in _evaluate_map_data_conditional once the encoding is known.
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    # Only GET responses (and the 304s revalidating them) are cacheable
+    if request.method != 'POST':
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+@app.route('/generate_map_data/stream')
+def stream_map_data():
+    """
+    Server-Sent Events variant of /generate_map_data. Each event carries part of the
+    payload as soon as it is ready, so the map renders before the slowest layer arrives.
+    Errors are sent as an event too, since EventSource cannot read error responses.
+    """
+    state = request.args.get('state')
+    district = request.args.get('district')
+
+    def generate():
+        error = _validate_map_request(state, district)
+        if error:
+            yield _sse_message({'error': error[0]})
+            return
+        try:
+            for part in _iter_cached_map_payload(state, district):
+                yield _sse_message(_with_tile_base_url(part, state, district))
+        except Exception as e:
+            print(f"Error in stream_map_data for {state}, {district}: {e}")
+            yield _sse_message({'error': f'Map data generation failed: {e}. Check server logs.'})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/tiles/<layer>/<state>/<district>/<int:z>/<int:x>/<int:y>.png')
+def get_tile(layer, state, district, z, x, y):
+    """
+    Tile origin for the CDN configured in TILE_BASE_URL. Resolves the Earth Engine tile
+    URL for the layer and district and streams the tile through with a cacheable response.
+    """
+    if layer not in TILE_LAYERS:
+        return jsonify({'error': f'Unknown layer: {layer}'}), 404
+    error = _validate_map_request(state, district)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+
+    try:
+        return _fetch_tile(_get_tile_url(layer, state, district), z, x, y)
+    except Exception as e:
+        print(f"Error fetching {layer} tile for {state}, {district}: {e}")
+        return jsonify({'error': f'Tile fetch failed: {e}'}), 502
+
+@app.route('/tiles/boundary/<int:z>/<int:x>/<int:y>.png')
+def get_boundary_tile(z, x, y):
+    """Tile origin for the nationwide district boundary layer (BOUNDARY_URL)."""
+    if not BOUNDARY_URL:
+        return jsonify({'error': 'Earth Engine assets not loaded. Check server logs for EE initialization errors.'}), 500
+
+    try:
+        return _fetch_tile(BOUNDARY_URL, z, x, y)
+    except Exception as e:
+        print(f"Error fetching boundary tile: {e}")
+        return jsonify({'error': f'Tile fetch failed: {e}'}), 502
+
 # ==============================================================================
 # Run Flask app
 # ==============================================================================
+# Development server only; in production run under gunicorn (see gunicorn.conf.py).
+# Set FLASK_DEBUG=1 to enable the debugger and reloader locally.
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run()
\ No newline at end of file
@@ -0,0 +1,12 @@
+# gunicorn.conf.py
+# Production server settings: gunicorn -c gunicorn.conf.py app:app
+# Requests spend almost all their time waiting on Earth Engine, so gevent workers
+# keep many requests in flight per process instead of serializing them.
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'gevent'
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_connections = 100
+timeout = 120 # Uncached map payloads can take a while on large districts
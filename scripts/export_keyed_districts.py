@@ -0,0 +1,32 @@
+# scripts/export_keyed_districts.py
+# One-time export of the district boundaries with a combined 'stdt' ("state|district")
+# property, so the app can look up a district with a single equality filter.
+#
+#   python scripts/export_keyed_districts.py
+import ee
+
+KEYED_ASSET_ID = 'users/sachinbobbili/India_Dist_keyed'
+
+
+def main():
+    ee.Initialize(project='ee-sachinbobbili')
+    print("Earth Engine initialized successfully.")
+
+    india_dist_fc = ee.FeatureCollection("users/sachinbobbili/India_Dist")
+
+    # Must match the key built in app.py: f"{state}|{district}"
+    keyed_fc = india_dist_fc.map(
+        lambda f: f.set('stdt', ee.String(f.get('stname')).cat('|').cat(f.get('dtname')))
+    )
+
+    task = ee.batch.Export.table.toAsset(
+        collection=keyed_fc,
+        description='India_Dist_keyed',
+        assetId=KEYED_ASSET_ID
+    )
+    task.start()
+    print(f"Started export task {task.id} to {KEYED_ASSET_ID}. Monitor it in the Earth Engine Tasks tab.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+# scripts/export_slope_asset.py
+# One-time export of a nationwide slope image derived from SRTM DEM 90m, so the app
+# reads a materialized raster instead of running ee.Terrain.slope on every request.
+#
+#   python scripts/export_slope_asset.py
+import ee
+
+SLOPE_ASSET_ID = 'users/sachinbobbili/India_slope'
+
+
+def main():
+    ee.Initialize(project='ee-sachinbobbili')
+    print("Earth Engine initialized successfully.")
+
+    india_dist_fc = ee.FeatureCollection("users/sachinbobbili/India_Dist")
+    srtm_dem_90m = ee.Image("CGIAR/SRTM90_V4")
+
+    india_geom = india_dist_fc.geometry()
+    slope = ee.Terrain.slope(srtm_dem_90m).clip(india_geom) # Slope in degrees
+
+    task = ee.batch.Export.image.toAsset(
+        image=slope,
+        description='India_slope',
+        assetId=SLOPE_ASSET_ID,
+        region=india_geom.bounds(),
+        scale=90, # Native SRTM DEM 90m resolution
+        maxPixels=1e13
+    )
+    task.start()
+    print(f"Started export task {task.id} to {SLOPE_ASSET_ID}. Monitor it in the Earth Engine Tasks tab.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# scripts/precompute_dropdowns.py
+# Run once (and whenever the district asset changes) to write the state and district
+# dropdown lists as static JSON, so /get_states and /get_districts/<state> never hit Earth Engine.
+#
+#   python scripts/precompute_dropdowns.py
+import os
+import json
+import ee
+
+# Output location served by app.py (static/data)
+STATIC_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'data')
+DISTRICTS_DIR = os.path.join(STATIC_DATA_DIR, 'districts')
+
+
+def main():
+    ee.Initialize(project='ee-sachinbobbili')
+    print("Earth Engine initialized successfully.")
+
+    india_dist_fc = ee.FeatureCollection("users/sachinbobbili/India_Dist")
+
+    # Fetch every (state, district) pair in a single request
+    pairs = india_dist_fc.reduceColumns(
+        ee.Reducer.toList(2), ['stname', 'dtname']
+    ).get('list').getInfo()
+
+    districts_by_state = {}
+    for stname, dtname in pairs:
+        districts_by_state.setdefault(stname, set()).add(dtname)
+
+    os.makedirs(DISTRICTS_DIR, exist_ok=True)
+
+    # Same response shapes as the /get_states and /get_districts/<state> endpoints
+    with open(os.path.join(STATIC_DATA_DIR, 'states.json'), 'w') as f:
+        json.dump({'states': sorted(districts_by_state)}, f)
+
+    for stname, districts in districts_by_state.items():
+        with open(os.path.join(DISTRICTS_DIR, f'{stname}.json'), 'w') as f:
+            json.dump({'districts': sorted(districts)}, f)
+
+    print(f"Wrote {len(districts_by_state)} states to {STATIC_DATA_DIR}")
+
+
+if __name__ == '__main__':
+    main()
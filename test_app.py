@@ -0,0 +1,122 @@
+import time
+
+import pytest
+from cachelib import SimpleCache
+
+
+def _tile_url(map_id):
+    return f'https://earthengine-highvolume.googleapis.com/v1/projects/ee-sachinbobbili/maps/{map_id}/tiles/{{z}}/{{x}}/{{y}}'
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    # app.py creates templates/maps under the working directory on import
+    monkeypatch.chdir(tmp_path)
+    import app
+
+    # Stand-ins for the Earth Engine assets, which need credentials to load
+    for name in ['INDIA_DIST_FC', 'DYNAMIC_WORLD', 'SRTM_DEM_90M', 'SRTM_SLOPE',
+                 'HYDROSHEDS_RIVERS_FC', 'JRC_GSW', 'BOUNDARY_URL']:
+        monkeypatch.setattr(app, name, object())
+    monkeypatch.setitem(app.DISTRICT_CACHE, ('Kerala', 'Idukki'), {
+        'center': [9.9, 77.0],
+        'bounds': [[9.2, 76.6], [10.3, 77.4]],
+    })
+
+    # Same shape as a payload built by _iter_map_payload; the tile URLs alone
+    # take the body past COMPRESS_MIN_SIZE
+    payload = {
+        'boundary_url': _tile_url('0f3e9a7c41d2b8e65a1c9d0e7b4f2a36-5d8c1e9f0a7b3c2d4e6f8a1b9c0d7e5f'),
+        'bounds': [[9.2, 76.6], [10.3, 77.4]],
+        'center': [9.9, 77.0],
+        'zoom': 9,
+        'chart_data': app._build_chart_data({'areas': [
+            {'class': 1, 'sum': 2.8e9}, {'class': 4, 'sum': 6.1e8}, {'class': 6, 'sum': 9.5e7},
+        ]}),
+        'status': 'success',
+    }
+    for i, layer in enumerate(app.TILE_LAYERS):
+        payload[f'{layer}_url'] = _tile_url(f'{i:032x}-{i:032x}')
+    monkeypatch.setattr(app, '_get_map_payload', lambda state, district: payload)
+    return app
+
+
+URL = '/generate_map_data?state=Kerala&district=Idukki'
+
+
+def test_generate_map_data_revalidates_compressed_etag(app_module):
+    client = app_module.app.test_client()
+
+    response = client.get(URL, headers={'Accept-Encoding': 'br'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'br'
+    etag = response.headers['ETag']
+    assert etag.endswith(':br"')
+
+    response = client.get(URL, headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+    response = client.post('/generate_map_data', json={'state': 'Kerala', 'district': 'Idukki'},
+                           headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+    assert response.status_code == 412
+
+
+def test_generate_map_data_etag_is_per_encoding(app_module):
+    client = app_module.app.test_client()
+
+    br_etag = client.get(URL, headers={'Accept-Encoding': 'br'}).headers['ETag']
+
+    # A Brotli validator does not revalidate the gzip representation
+    response = client.get(URL, headers={'Accept-Encoding': 'gzip', 'If-None-Match': br_etag})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] != br_etag
+
+    # The uncompressed representation has its own validator as well
+    response = client.get(URL, headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    identity_etag = response.headers['ETag']
+    assert identity_etag != br_etag
+
+    response = client.get(URL, headers={'Accept-Encoding': 'identity', 'If-None-Match': identity_etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == identity_etag
+
+
+def test_generate_map_data_cache_control_only_on_get(app_module):
+    client = app_module.app.test_client()
+
+    response = client.get(URL)
+    assert response.headers['Cache-Control'] == 'public, max-age=3600'
+
+    response = client.get(URL, headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert response.headers['Cache-Control'] == 'public, max-age=3600'
+
+    response = client.post('/generate_map_data', json={'state': 'Kerala', 'district': 'Idukki'})
+    assert response.status_code == 200
+    assert 'Cache-Control' not in response.headers
+
+
+def test_abandoned_stream_still_caches_payload(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAP_PAYLOAD_CACHE', SimpleCache())
+    payload = app_module._get_map_payload('Kerala', 'Idukki')
+
+    def iter_map_payload(state, district, end_date):
+        for key, value in payload.items():
+            yield {key: value}
+
+    monkeypatch.setattr(app_module, '_iter_map_payload', iter_map_payload)
+
+    # The client disconnects after the first part
+    parts = app_module._iter_cached_map_payload('Kerala', 'Idukki')
+    next(parts)
+    parts.close()
+
+    cache_key = app_module._map_payload_key('Kerala', 'Idukki', app_module.datetime.now())
+    deadline = time.monotonic() + 5
+    while app_module.MAP_PAYLOAD_CACHE.get(cache_key) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert app_module.MAP_PAYLOAD_CACHE.get(cache_key) == payload